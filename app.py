@@ -1,11 +1,20 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, abort
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask_session import Session
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta
+import hashlib
+import orjson
+import redis
 import os
 from functools import wraps
 import secrets
-from werkzeug.utils import secure_filename
-import uuid
+import hmac
+import threading
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
 
 app = Flask(__name__)
 
@@ -15,15 +24,43 @@ if os.environ.get('SECRET_KEY'):
 else:
     app.config['SECRET_KEY'] = secrets.token_hex(32)
 
+# Server-side session configuration (Redis)
+redis_pool = redis.ConnectionPool.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+cache = redis.Redis(connection_pool=redis_pool)
+app.config.update(
+    SESSION_TYPE='redis',
+    SESSION_REDIS=cache,
+    SESSION_USE_SIGNER=False,
+    SESSION_PERMANENT=False,
+)
+app.permanent_session_lifetime = timedelta(hours=12)
+Session(app)
+
 # Database configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "chat.db")}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False},
+}
 
 # File upload configuration
 UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
+ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Message history paging
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+# Response caching
+PUBLIC_ROOMS_CACHE_KEY = 'public_rooms'
+PUBLIC_ROOMS_CACHE_TTL = 30  # seconds
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -32,16 +69,93 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 
+# Password hashing (argon2id)
+ph = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+# Verified against when the user is unknown, so every failed login costs one KDF call
+DUMMY_HASH = ph.hash(secrets.token_hex(16))
+
+
+def valid_password(password):
+    """A non-empty string that can be UTF-8 encoded (JSON may carry lone surrogates)"""
+    if not isinstance(password, str) or not password:
+        return False
+    try:
+        password.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def verify_password(user, password):
+    """Check a login attempt, upgrading legacy plaintext or outdated hashes on success"""
+    if user is None:
+        stored, legacy = DUMMY_HASH, False
+    else:
+        stored, legacy = user.password, not user.password.startswith('$argon2')
+
+    if legacy:
+        # Accounts created before hashing still hold the plaintext password
+        if not hmac.compare_digest(stored.encode(), password.encode()):
+            try:
+                ph.verify(DUMMY_HASH, password)
+            except VerifyMismatchError:
+                pass
+            return False
+    else:
+        try:
+            ph.verify(stored, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+        if user is None:
+            return False
+
+    if legacy or ph.check_needs_rehash(stored):
+        user.password = ph.hash(password)
+        db.session.commit()
+    return True
+
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def save_upload(stream, path):
+    """Copy an upload to disk in chunks, hashing as it goes.
+
+    Returns ``(sha256_hex, size)``, or None (and removes the file) if it exceeds MAX_FILE_SIZE.
+    """
+    hasher = hashlib.sha256()
+    copied = 0
+    with open(path, 'wb') as out:
+        while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+            copied += len(chunk)
+            if copied > MAX_FILE_SIZE:
+                break
+            hasher.update(chunk)
+            out.write(chunk)
+    if copied > MAX_FILE_SIZE:
+        os.remove(path)
+        return None
+    return hasher.hexdigest(), copied
 
 db = SQLAlchemy(app)
 
+# SQLite tuning: WAL lets readers proceed while a writer commits
+with app.app_context():
+    @event.listens_for(db.engine, 'connect')
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.close()
+
 # Database Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     messages = db.relationship('Message', backref='author', lazy=True)
     rooms = db.relationship('Room', secondary='room_member', backref='members')
@@ -59,7 +173,7 @@ room_member = db.Table('room_member',
 
 class Room(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), unique=True, nullable=False)
     type = db.Column(db.String(20), default='public')  # 'public' or 'private'
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -68,27 +182,57 @@ class Room(db.Model):
     def __repr__(self):
         return f'<Room {self.name}>'
 
-    def to_dict(self):
+    @classmethod
+    def counts_for(cls, room_ids):
+        """Return {room_id: member_count} for the given rooms in one query"""
+        if not room_ids:
+            return {}
+        rows = db.session.query(room_member.c.room_id, func.count()) \
+            .filter(room_member.c.room_id.in_(room_ids)) \
+            .group_by(room_member.c.room_id).all()
+        return dict(rows)
+
+    def to_dict(self, member_count=None):
+        if member_count is None:
+            member_count = Room.counts_for([self.id]).get(self.id, 0)
         return {
             'id': self.id,
             'name': self.name,
             'type': self.type,
-            'member_count': len(self.members),
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'member_count': member_count,
+            'created_at': self.created_at.isoformat(sep=' ', timespec='seconds')
         }
 
 class Contact(db.Model):
+    # (user_id, contact_user_id) also serves lookups by user_id alone
+    __table_args__ = (db.Index('ix_contact_pair', 'user_id', 'contact_user_id', unique=True),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    contact_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    contact_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     contact_user = db.relationship('User', foreign_keys='Contact.contact_user_id', backref='contacted_by')
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=True)
+    room = db.relationship('Room')
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f'<Contact {self.user_id} -> {self.contact_user_id}>'
 
+class UploadedFile(db.Model):
+    # Images are stored once per distinct content, named by their SHA-256
+    hash = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadedFile {self.hash}>'
+
 class Message(db.Model):
+    # Keyset pagination walks (room_id, id); also serves lookups by room_id alone
+    __table_args__ = (db.Index('ix_message_room_id_id', 'room_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
@@ -106,15 +250,61 @@ class Message(db.Model):
             'image_url': self.image_url,
             'username': self.author.username,
             'user_id': self.user_id,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'created_at': self.created_at.isoformat(sep=' ', timespec='seconds')
         }
 
+# Pre-encoded JSON error bodies
+ERR_LOGIN_REQUIRED = orjson.dumps({'error': 'Login required'})
+ERR_CREDENTIALS_REQUIRED = orjson.dumps({'error': 'Username and password required'})
+ERR_USERNAME_TAKEN = orjson.dumps({'error': 'Username already exists'})
+ERR_INVALID_CREDENTIALS = orjson.dumps({'error': 'Invalid username or password'})
+ERR_ROOM_NAME_REQUIRED = orjson.dumps({'error': 'Room name required'})
+ERR_ROOM_EXISTS = orjson.dumps({'error': 'Room already exists'})
+ERR_ALREADY_MEMBER = orjson.dumps({'error': 'Already member of this room'})
+ERR_NOT_MEMBER = orjson.dumps({'error': 'Not member of this room'})
+ERR_FILE_TOO_LARGE = orjson.dumps({'error': 'File size exceeds 10MB limit'})
+ERR_MESSAGE_EMPTY = orjson.dumps({'error': 'Message content or image required'})
+ERR_INVALID_FILE_TYPE = orjson.dumps({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WebP, BMP'})
+ERR_USERNAME_REQUIRED = orjson.dumps({'error': 'Username required'})
+ERR_USER_NOT_FOUND = orjson.dumps({'error': 'User not found'})
+ERR_CANNOT_ADD_SELF = orjson.dumps({'error': 'Cannot add yourself'})
+ERR_ALREADY_CONTACT = orjson.dumps({'error': 'Already in contacts'})
+ERR_NOT_LOGGED_IN = orjson.dumps({'error': 'Not logged in'})
+
+def json_error(body, status):
+    """Error response from a pre-encoded body"""
+    # A new Response per call: Flask may add headers (e.g. Set-Cookie) after the view returns
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def ojson(data, status=200):
+    """jsonify replacement for large list payloads, encoded with orjson"""
+    return app.response_class(orjson.dumps(data), status=status, mimetype='application/json')
+
+def get_room_access(room_id, user_id):
+    """Fetch a room's id/type and the user's membership in one round-trip; 404s if the room is missing"""
+    is_member = db.exists().where(
+        (room_member.c.room_id == Room.id) & (room_member.c.user_id == user_id)
+    ).label('is_member')
+    row = db.session.execute(
+        db.select(Room.id, Room.type, is_member).where(Room.id == room_id)
+    ).first()
+    if row is None:
+        abort(404)
+    return row
+
+def regenerate_session():
+    """Drop the client-supplied session id and issue a fresh one (prevents session fixation)"""
+    interface = app.session_interface
+    interface.redis.delete(interface.key_prefix + session.sid)
+    session.clear()
+    session.sid = interface._generate_sid()
+
 # Login required decorator
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
-            return jsonify({'error': 'Login required'}), 401
+            return json_error(ERR_LOGIN_REQUIRED, 401)
         return f(*args, **kwargs)
     return decorated_function
 
@@ -131,16 +321,20 @@ def register():
     username = data.get('username')
     password = data.get('password')
 
-    if not username or not password:
-        return jsonify({'error': 'Username and password required'}), 400
-
-    if User.query.filter_by(username=username).first():
-        return jsonify({'error': 'Username already exists'}), 400
+    if not username or not valid_password(password):
+        return json_error(ERR_CREDENTIALS_REQUIRED, 400)
 
-    user = User(username=username, password=password)
+    # The UNIQUE constraint on username decides races between concurrent signups
+    user = User(username=username, password=ph.hash(password))
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return json_error(ERR_USERNAME_TAKEN, 400)
 
+    regenerate_session()
+    session.permanent = True
     session['user_id'] = user.id
     session['username'] = user.username
     return jsonify({'success': True, 'message': 'User registered successfully'})
@@ -151,11 +345,16 @@ def login():
     username = data.get('username')
     password = data.get('password')
 
+    if not valid_password(password):
+        return json_error(ERR_INVALID_CREDENTIALS, 401)
+
     user = User.query.filter_by(username=username).first()
 
-    if not user or user.password != password:
-        return jsonify({'error': 'Invalid username or password'}), 401
+    if not verify_password(user, password):
+        return json_error(ERR_INVALID_CREDENTIALS, 401)
 
+    regenerate_session()
+    session.permanent = True
     session['user_id'] = user.id
     session['username'] = user.username
     return jsonify({'success': True, 'message': 'Logged in successfully'})
@@ -171,14 +370,20 @@ def logout():
 def get_rooms():
     """Get all rooms the user is member of"""
     user = User.query.get(session['user_id'])
-    return jsonify([room.to_dict() for room in user.rooms])
+    counts = Room.counts_for([room.id for room in user.rooms])
+    return ojson([room.to_dict(member_count=counts.get(room.id, 0)) for room in user.rooms])
 
 @app.route('/api/rooms/public', methods=['GET'])
 @login_required
 def get_public_rooms():
-    """Get all public rooms"""
-    public_rooms = Room.query.filter_by(type='public').all()
-    return jsonify([room.to_dict() for room in public_rooms])
+    """Get all public rooms (cached briefly in Redis)"""
+    body = cache.get(PUBLIC_ROOMS_CACHE_KEY)
+    if body is None:
+        public_rooms = Room.query.filter_by(type='public').all()
+        counts = Room.counts_for([room.id for room in public_rooms])
+        body = orjson.dumps([room.to_dict(member_count=counts.get(room.id, 0)) for room in public_rooms])
+        cache.setex(PUBLIC_ROOMS_CACHE_KEY, PUBLIC_ROOMS_CACHE_TTL, body)
+    return app.response_class(body, mimetype='application/json')
 
 @app.route('/api/rooms', methods=['POST'])
 @login_required
@@ -189,21 +394,21 @@ def create_room():
     room_type = data.get('type', 'private')
 
     if not room_name:
-        return jsonify({'error': 'Room name required'}), 400
-
-    # Check if room already exists
-    existing_room = Room.query.filter_by(name=room_name).first()
-    if existing_room:
-        return jsonify({'error': 'Room already exists'}), 400
+        return json_error(ERR_ROOM_NAME_REQUIRED, 400)
 
+    # Add creator to room members; the ORM fills room_member.room_id at commit
     room = Room(name=room_name, type=room_type, creator_id=session['user_id'])
-    db.session.add(room)
-    db.session.flush()
-    
-    # Add creator to room members
-    user = User.query.get(session['user_id'])
+    user = db.session.get(User, session['user_id'])
     user.rooms.append(room)
-    db.session.commit()
+    db.session.add(room)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return json_error(ERR_ROOM_EXISTS, 400)
+
+    if room_type == 'public':
+        cache.delete(PUBLIC_ROOMS_CACHE_KEY)
 
     return jsonify({'success': True, 'room': room.to_dict()})
 
@@ -211,65 +416,116 @@ def create_room():
 @login_required
 def join_room(room_id):
     """Join an existing room"""
-    room = Room.query.get_or_404(room_id)
-    user = User.query.get(session['user_id'])
+    room = get_room_access(room_id, session['user_id'])
 
-    if room in user.rooms:
-        return jsonify({'error': 'Already member of this room'}), 400
+    if room.is_member:
+        return json_error(ERR_ALREADY_MEMBER, 400)
 
-    user.rooms.append(room)
+    db.session.execute(room_member.insert().values(room_id=room_id, user_id=session['user_id']))
     db.session.commit()
 
+    # Public listings include member counts
+    if room.type == 'public':
+        cache.delete(PUBLIC_ROOMS_CACHE_KEY)
+
     return jsonify({'success': True, 'message': 'Joined room successfully'})
 
 @app.route('/api/rooms/<int:room_id>/messages', methods=['GET'])
 @login_required
 def get_room_messages(room_id):
-    """Get messages from a specific room"""
-    room = Room.query.get_or_404(room_id)
-    user = User.query.get(session['user_id'])
+    """Get a page of messages from a specific room, oldest first.
 
-    # Check if user is member of room
-    if room not in user.rooms:
-        return jsonify({'error': 'Not member of this room'}), 403
+    Returns the newest ``limit`` messages, those older than ``before``
+    (a message id) when paging back through history, or the first ``limit``
+    newer than ``after`` when polling for new messages.
+    """
+    room = get_room_access(room_id, session['user_id'])
 
-    messages = Message.query.filter_by(room_id=room_id).order_by(Message.created_at).all()
-    return jsonify([msg.to_dict() for msg in messages])
+    # Check if user is member of room
+    if not room.is_member:
+        return json_error(ERR_NOT_MEMBER, 403)
+
+    limit = request.args.get('limit', MESSAGE_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+
+    # Project only the serialized columns; skips ORM hydration of Message/User
+    query = db.select(Message.id, Message.content, Message.image_url, User.username,
+                      Message.user_id, Message.created_at) \
+        .join(User, User.id == Message.user_id) \
+        .where(Message.room_id == room_id)
+    if after is not None:
+        rows = db.session.execute(
+            query.where(Message.id > after).order_by(Message.id).limit(limit)
+        ).all()
+    else:
+        if before:
+            query = query.where(Message.id < before)
+        rows = db.session.execute(query.order_by(Message.id.desc()).limit(limit)).all()
+        rows.reverse()
+
+    return ojson([{
+        'id': row.id,
+        'content': row.content,
+        'image_url': row.image_url,
+        'username': row.username,
+        'user_id': row.user_id,
+        'created_at': row.created_at.isoformat(sep=' ', timespec='seconds')
+    } for row in rows])
 
 @app.route('/api/rooms/<int:room_id>/messages', methods=['POST'])
 @login_required
 def send_room_message(room_id):
     """Send message to a room"""
-    room = Room.query.get_or_404(room_id)
-    user = User.query.get(session['user_id'])
+    room = get_room_access(room_id, session['user_id'])
 
     # Check if user is member of room
-    if room not in user.rooms:
-        return jsonify({'error': 'Not member of this room'}), 403
+    if not room.is_member:
+        return json_error(ERR_NOT_MEMBER, 403)
+
+    # Reject oversized bodies before the multipart parser touches them
+    if request.content_length and request.content_length > MAX_FILE_SIZE:
+        return json_error(ERR_FILE_TOO_LARGE, 413)
 
     content = request.form.get('content', '').strip()
     image_file = request.files.get('image')
     image_url = None
 
     if not content and not image_file:
-        return jsonify({'error': 'Message content or image required'}), 400
+        return json_error(ERR_MESSAGE_EMPTY, 400)
 
     # Handle image upload if provided
     if image_file:
         if not allowed_file(image_file.filename):
-            return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WebP, BMP'}), 400
-
-        image_file.seek(0, os.SEEK_END)
-        file_size = image_file.tell()
-        image_file.seek(0)
-
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': 'File size exceeds 10MB limit'}), 400
-
-        filename = secure_filename(image_file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        image_file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-        image_url = f"/static/uploads/{unique_filename}"
+            return json_error(ERR_INVALID_FILE_TYPE, 400)
+
+        # The whitelisted suffix the name matched; splitext misses names like '.png'
+        name = image_file.filename.lower()
+        ext = next(suffix for suffix in ALLOWED_SUFFIXES if name.endswith(suffix))
+        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f".{secrets.token_urlsafe(12)}.part")
+        saved = save_upload(image_file.stream, temp_path)
+        if saved is None:
+            return json_error(ERR_FILE_TOO_LARGE, 413)
+        file_hash, file_size = saved
+
+        # Reuse the stored copy when the same content was uploaded before
+        uploaded = db.session.get(UploadedFile, file_hash)
+        if uploaded:
+            os.remove(temp_path)
+        else:
+            stored_filename = f"{file_hash}{ext}"
+            os.replace(temp_path, os.path.join(app.config['UPLOAD_FOLDER'], stored_filename))
+            uploaded = UploadedFile(hash=file_hash, path=f"/static/uploads/{stored_filename}",
+                                    size=file_size, content_type=image_file.mimetype)
+            db.session.add(uploaded)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A concurrent upload of the same content registered it first
+                db.session.rollback()
+                uploaded = db.session.get(UploadedFile, file_hash)
+        image_url = uploaded.path
 
     message = Message(content=content, image_url=image_url, user_id=session['user_id'], room_id=room_id)
     db.session.add(message)
@@ -282,7 +538,8 @@ def send_room_message(room_id):
 @login_required
 def get_contacts():
     """Get user's contacts"""
-    contacts = Contact.query.filter_by(user_id=session['user_id']).all()
+    contacts = Contact.query.options(selectinload(Contact.contact_user)) \
+        .filter_by(user_id=session['user_id']).all()
     result = []
     for contact in contacts:
         result.append({
@@ -290,9 +547,9 @@ def get_contacts():
             'username': contact.contact_user.username,
             'user_id': contact.contact_user_id,
             'room_id': contact.room_id,
-            'added_at': contact.added_at.strftime('%Y-%m-%d %H:%M:%S')
+            'added_at': contact.added_at.isoformat(sep=' ', timespec='seconds')
         })
-    return jsonify(result)
+    return ojson(result)
 
 @app.route('/api/contacts/search', methods=['GET'])
 @login_required
@@ -301,20 +558,20 @@ def search_contact():
     username = request.args.get('username', '').strip()
 
     if not username:
-        return jsonify({'error': 'Username required'}), 400
+        return json_error(ERR_USERNAME_REQUIRED, 400)
 
     user = User.query.filter_by(username=username).first()
 
     if not user:
-        return jsonify({'error': 'User not found'}), 404
+        return json_error(ERR_USER_NOT_FOUND, 404)
 
     if user.id == session['user_id']:
-        return jsonify({'error': 'Cannot add yourself'}), 400
+        return json_error(ERR_CANNOT_ADD_SELF, 400)
 
     return jsonify({
         'id': user.id,
         'username': user.username,
-        'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        'created_at': user.created_at.isoformat(sep=' ', timespec='seconds')
     })
 
 @app.route('/api/contacts', methods=['POST'])
@@ -325,47 +582,46 @@ def add_contact():
     contact_username = data.get('username', '').strip()
 
     if not contact_username:
-        return jsonify({'error': 'Username required'}), 400
+        return json_error(ERR_USERNAME_REQUIRED, 400)
 
     contact_user = User.query.filter_by(username=contact_username).first()
 
     if not contact_user:
-        return jsonify({'error': 'User not found'}), 404
+        return json_error(ERR_USER_NOT_FOUND, 404)
 
     if contact_user.id == session['user_id']:
-        return jsonify({'error': 'Cannot add yourself'}), 400
-
-    # Check if already a contact
-    existing_contact = Contact.query.filter_by(
-        user_id=session['user_id'],
-        contact_user_id=contact_user.id
-    ).first()
-
-    if existing_contact:
-        return jsonify({'error': 'Already in contacts'}), 400
+        return json_error(ERR_CANNOT_ADD_SELF, 400)
 
     # Create private room for this contact
     room_name = f"{session['username']}-{contact_username}"
     existing_room = Room.query.filter_by(name=room_name).first()
     
+    user = db.session.get(User, session['user_id'])
+    joined_public_room = False
     if not existing_room:
         room = Room(name=room_name, type='private', creator_id=session['user_id'])
         db.session.add(room)
-        db.session.flush()
-        
-        user = User.query.get(session['user_id'])
-        contact_user_obj = User.query.get(contact_user.id)
         user.rooms.append(room)
-        contact_user_obj.rooms.append(room)
+        contact_user.rooms.append(room)
     else:
         room = existing_room
-        user = User.query.get(session['user_id'])
         if room not in user.rooms:
             user.rooms.append(room)
+            joined_public_room = room.type == 'public'
 
-    contact = Contact(user_id=session['user_id'], contact_user_id=contact_user.id, room_id=room.id)
+    # Linked through the relationship so room.id is resolved at commit without a flush
+    contact = Contact(user_id=session['user_id'], contact_user_id=contact_user.id, room=room)
     db.session.add(contact)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # ix_contact_pair is unique, so a repeat add fails here rather than via a pre-check
+        db.session.rollback()
+        return json_error(ERR_ALREADY_CONTACT, 400)
+
+    # Public listings include member counts
+    if joined_public_room:
+        cache.delete(PUBLIC_ROOMS_CACHE_KEY)
 
     return jsonify({
         'success': True,
@@ -379,20 +635,35 @@ def add_contact():
     })
 
 # Initialize Public Room
+public_room_ready = threading.Event()
+
+def seed():
+    """Create the public room once; returns True when it exists"""
+    if public_room_ready.is_set():
+        return True
+    public_room = Room.query.filter_by(name='Public Room', type='public').first()
+    if not public_room:
+        # The room needs a creator, so seeding waits for the first user
+        admin_user = User.query.first()
+        if not admin_user:
+            return False
+        public_room = Room(name='Public Room', type='public', creator_id=admin_user.id)
+        db.session.add(public_room)
+        db.session.commit()
+        cache.delete(PUBLIC_ROOMS_CACHE_KEY)
+    public_room_ready.set()
+    return True
+
 @app.before_request
 def init_public_room():
-    """Create public room on first run"""
+    """Seed the public room until it exists, then skip the DB entirely"""
+    if public_room_ready.is_set():
+        return
     try:
         if request.endpoint and not request.endpoint.startswith('static'):
-            public_room = Room.query.filter_by(name='Public Room', type='public').first()
-            if not public_room:
-                admin_user = User.query.first()
-                if admin_user:
-                    public_room = Room(name='Public Room', type='public', creator_id=admin_user.id)
-                    db.session.add(public_room)
-                    db.session.commit()
+            seed()
     except:
-        pass  # Ignore errors during init
+        db.session.rollback()  # Ignore errors during init
 
 @app.route('/api/user', methods=['GET'])
 def get_user():
@@ -401,9 +672,19 @@ def get_user():
             'user_id': session['user_id'],
             'username': session['username']
         })
-    return jsonify({'error': 'Not logged in'}), 401
+    return json_error(ERR_NOT_LOGGED_IN, 401)
 
-if __name__ == '__main__':
+def init_db():
+    """Create tables and seed data; run once per deployment, not per worker"""
     with app.app_context():
         db.create_all()
+        seed()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and seed the public room"""
+    init_db()
+
+if __name__ == '__main__':
+    init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,16 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_connections = 1000
+
+
+def on_starting(server):
+    # Create tables once in a child process, before any worker forks, so workers
+    # don't race on one SQLite file and the master never imports the app itself
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                   cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
@@ -2,6 +2,9 @@ let currentUser = null;
 let currentRoom = null;
 let pollInterval;
 let displayedMessageIds = new Set();
+let hasOlderMessages = true;
+let loadingOlderMessages = false;
+const MESSAGE_POLL_LIMIT = 200;  // MAX_MESSAGE_PAGE_SIZE in app.py
 
 async function getCurrentUser() {
     try {
@@ -81,6 +84,7 @@ function displayRooms(userRooms, publicRooms) {
 async function selectRoom(roomId) {
     currentRoom = roomId;
     displayedMessageIds.clear();
+    hasOlderMessages = true;
     
     // Clear all messages from DOM to prevent duplication
     const container = document.getElementById('messagesContainer');
@@ -122,17 +126,69 @@ async function joinRoom(roomId) {
 async function loadMessages() {
     if (!currentRoom) return;
 
+    const roomId = currentRoom;
+
     try {
-        const response = await fetch(`/api/rooms/${currentRoom}/messages`);
-        if (response.ok) {
+        if (displayedMessageIds.size === 0) {
+            // First load: the newest page
+            const response = await fetch(`/api/rooms/${roomId}/messages`);
+            if (response.ok && roomId === currentRoom) {
+                displayMessages(await response.json());
+            }
+            return;
+        }
+
+        // Poll forward from the newest message shown, catching up page by page
+        while (roomId === currentRoom) {
+            const newestId = Math.max(...displayedMessageIds);
+            const response = await fetch(`/api/rooms/${roomId}/messages?after=${newestId}&limit=${MESSAGE_POLL_LIMIT}`);
+            if (!response.ok || roomId !== currentRoom) return;
+
             const messages = await response.json();
             displayMessages(messages);
+            if (messages.length < MESSAGE_POLL_LIMIT) return;
         }
     } catch (error) {
         console.error('Error loading messages:', error);
     }
 }
 
+function createMessageElement(msg) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${msg.user_id === currentUser.user_id ? 'own' : 'other'}`;
+
+    const headerDiv = document.createElement('div');
+    headerDiv.className = 'message-header';
+    headerDiv.textContent = msg.username;
+
+    if (msg.image_url) {
+        const imageDiv = document.createElement('div');
+        imageDiv.className = 'message-image';
+        const img = document.createElement('img');
+        img.src = msg.image_url;
+        img.alt = 'Shared image';
+        img.addEventListener('click', () => openImageModal(msg.image_url));
+        imageDiv.appendChild(img);
+        messageDiv.appendChild(imageDiv);
+    }
+
+    if (msg.content) {
+        const contentDiv = document.createElement('div');
+        contentDiv.className = 'message-content';
+        contentDiv.textContent = msg.content;
+        messageDiv.appendChild(contentDiv);
+    }
+
+    const timeDiv = document.createElement('div');
+    timeDiv.className = 'message-time';
+    timeDiv.textContent = msg.created_at;
+
+    messageDiv.insertBefore(headerDiv, messageDiv.firstChild);
+    messageDiv.appendChild(timeDiv);
+
+    return messageDiv;
+}
+
 function displayMessages(messages) {
     const container = document.getElementById('messagesContainer');
     const wasAtBottom = container.scrollTop + container.clientHeight >= container.scrollHeight - 10;
@@ -140,46 +196,51 @@ function displayMessages(messages) {
     messages.forEach(msg => {
         if (!displayedMessageIds.has(msg.id)) {
             displayedMessageIds.add(msg.id);
+            container.appendChild(createMessageElement(msg));
+        }
+    });
 
-            const messageDiv = document.createElement('div');
-            messageDiv.className = `message ${msg.user_id === currentUser.user_id ? 'own' : 'other'}`;
-
-            const headerDiv = document.createElement('div');
-            headerDiv.className = 'message-header';
-            headerDiv.textContent = msg.username;
-
-            if (msg.image_url) {
-                const imageDiv = document.createElement('div');
-                imageDiv.className = 'message-image';
-                const img = document.createElement('img');
-                img.src = msg.image_url;
-                img.alt = 'Shared image';
-                img.addEventListener('click', () => openImageModal(msg.image_url));
-                imageDiv.appendChild(img);
-                messageDiv.appendChild(imageDiv);
-            }
+    // Auto-scroll to bottom if was already at bottom
+    if (wasAtBottom) {
+        container.scrollTop = container.scrollHeight;
+    }
+}
+
+async function loadOlderMessages() {
+    if (!currentRoom || !hasOlderMessages || loadingOlderMessages || displayedMessageIds.size === 0) return;
+
+    loadingOlderMessages = true;
+    const roomId = currentRoom;
+    const oldestId = Math.min(...displayedMessageIds);
 
-            if (msg.content) {
-                const contentDiv = document.createElement('div');
-                contentDiv.className = 'message-content';
-                contentDiv.textContent = msg.content;
-                messageDiv.appendChild(contentDiv);
+    try {
+        const response = await fetch(`/api/rooms/${roomId}/messages?before=${oldestId}`);
+        if (response.ok && roomId === currentRoom) {
+            const messages = await response.json();
+            if (messages.length === 0) {
+                hasOlderMessages = false;
+                return;
             }
 
-            const timeDiv = document.createElement('div');
-            timeDiv.className = 'message-time';
-            timeDiv.textContent = msg.created_at;
+            const container = document.getElementById('messagesContainer');
+            const previousHeight = container.scrollHeight;
+            const fragment = document.createDocumentFragment();
 
-            messageDiv.insertBefore(headerDiv, messageDiv.firstChild);
-            messageDiv.appendChild(timeDiv);
+            messages.forEach(msg => {
+                if (!displayedMessageIds.has(msg.id)) {
+                    displayedMessageIds.add(msg.id);
+                    fragment.appendChild(createMessageElement(msg));
+                }
+            });
+            container.insertBefore(fragment, container.firstChild);
 
-            container.appendChild(messageDiv);
+            // Keep the viewport on the message the user was reading
+            container.scrollTop = container.scrollHeight - previousHeight;
         }
-    });
-
-    // Auto-scroll to bottom if was already at bottom
-    if (wasAtBottom) {
-        container.scrollTop = container.scrollHeight;
+    } catch (error) {
+        console.error('Error loading older messages:', error);
+    } finally {
+        loadingOlderMessages = false;
     }
 }
 
@@ -369,4 +430,11 @@ document.addEventListener('DOMContentLoaded', () => {
     // Scroll to bottom initially
     const container = document.getElementById('messagesContainer');
     container.scrollTop = container.scrollHeight;
+
+    // Page back through history when scrolled to the top
+    container.addEventListener('scroll', () => {
+        if (container.scrollTop === 0) {
+            loadOlderMessages();
+        }
+    });
 });
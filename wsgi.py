@@ -0,0 +1,6 @@
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# Monkey-patching must happen before anything else imports socket/ssl/threading.
+from gevent import monkey
+monkey.patch_all()
+
+from app import app